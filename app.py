@@ -1,12 +1,13 @@
 import streamlit as st
 import os
-import pandas as pd
-from pypdf import PdfReader
-from docx import Document
-from pptx import Presentation
-from bs4 import BeautifulSoup
+import zipfile
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
 import io
 
+# Parser imports live inside their convert_* functions: Python's module
+# cache makes repeat calls free, and uploads never pay the import cost
+# of formats they don't use.
+
 # --- Configuration ---
 st.set_page_config(
     page_title="DocuConvert | Pro",
@@ -25,9 +26,45 @@ def format_file_size(size_in_bytes):
         return f"{size_in_bytes / (1024 * 1024):.2f} MB"
 
 # --- Conversion Logic (Pure Python) ---
-def convert_pdf(file_stream):
+# Below this page count, thread startup costs more than it saves
+_PDF_PARALLEL_THRESHOLD = 8
+
+def convert_pdf(data):
+    try:
+        import fitz  # PyMuPDF
+        doc = fitz.open(stream=data, filetype="pdf")
+        if len(doc) < _PDF_PARALLEL_THRESHOLD:
+            texts = [page.get_text("text") for page in doc]
+        else:
+            # get_text releases the GIL, so threads scale across pages
+            with ThreadPoolExecutor(max_workers=os.cpu_count()) as executor:
+                texts = list(executor.map(lambda i: doc[i].get_text("text"), range(len(doc))))
+        doc.close()
+        return "\n\n".join(texts)
+    except Exception as e:
+        return f"Error reading PDF: {str(e)}"
+
+def convert_pdf_pdfium(data):
+    """PDF backend for AGPL-sensitive deployments that avoid MuPDF."""
+    try:
+        import pypdfium2
+        pdf = pypdfium2.PdfDocument(data)
+        text = []
+        for page in pdf:
+            textpage = page.get_textpage()
+            text.append(textpage.get_text_range())
+            textpage.close()
+            page.close()
+        pdf.close()
+        return "\n\n".join(text)
+    except Exception as e:
+        return f"Error reading PDF: {str(e)}"
+
+def convert_pdf_pypdf(data):
+    """Pure-Python PDF backend (slowest, no native dependencies)."""
     try:
-        reader = PdfReader(file_stream)
+        from pypdf import PdfReader
+        reader = PdfReader(io.BytesIO(data))
         text = []
         for page in reader.pages:
             content = page.extract_text()
@@ -37,48 +74,203 @@ def convert_pdf(file_stream):
     except Exception as e:
         return f"Error reading PDF: {str(e)}"
 
-def convert_docx(file_stream):
+PDF_BACKENDS = {
+    "pymupdf": convert_pdf,
+    "pypdfium2": convert_pdf_pdfium,
+    "pypdf": convert_pdf_pypdf,
+}
+
+_DOCX_NS = "http://schemas.openxmlformats.org/wordprocessingml/2006/main"
+
+def convert_docx(data):
     try:
-        doc = Document(file_stream)
-        return "\n".join([para.text for para in doc.paragraphs])
+        import lxml.etree
+        # Walk w:p elements in the raw XML; avoids building a python-docx
+        # Paragraph wrapper per paragraph
+        with zipfile.ZipFile(io.BytesIO(data)) as z:
+            xml = z.read("word/document.xml")
+        root = lxml.etree.fromstring(xml)
+        return "\n".join(p.xpath("string(.)") for p in root.iter(f"{{{_DOCX_NS}}}p"))
     except Exception as e:
         return f"Error reading DOCX: {str(e)}"
 
-def convert_pptx(file_stream):
+_PPTX_NS = {"a": "http://schemas.openxmlformats.org/drawingml/2006/main"}
+
+def _slide_number(name):
+    return int(name[len("ppt/slides/slide"):-len(".xml")])
+
+def convert_pptx(data):
     try:
-        prs = Presentation(file_stream)
+        import lxml.etree
+        # XPath the a:t text nodes straight out of each slide's XML;
+        # skips python-pptx's per-shape wrapper objects
         text = []
-        for slide in prs.slides:
-            for shape in slide.shapes:
-                if hasattr(shape, "text"):
-                    text.append(shape.text)
+        with zipfile.ZipFile(io.BytesIO(data)) as z:
+            names = sorted(
+                (n for n in z.namelist()
+                 if n.startswith("ppt/slides/slide") and n.endswith(".xml")),
+                key=_slide_number
+            )
+            for name in names:
+                root = lxml.etree.fromstring(z.read(name))
+                text.extend(root.xpath("//a:t/text()", namespaces=_PPTX_NS))
         return "\n".join(text)
     except Exception as e:
         return f"Error reading PPTX: {str(e)}"
 
-def convert_excel(file_stream):
+def _rows_to_markdown(rows):
+    """Builds a Markdown table straight from row lists, no DataFrame."""
+    if not rows:
+        return ""
+    lines = ["| " + " | ".join(map(str, rows[0])) + " |"]
+    lines.append("|" + "---|" * len(rows[0]))
+    for row in rows[1:]:
+        lines.append("| " + " | ".join(map(str, row)) + " |")
+    return "\n".join(lines)
+
+def _df_to_md(df):
+    """Writes a DataFrame as a Markdown table via vectorized column ops."""
+    import numpy as np
+    if df.shape[1] == 0:
+        # Blank sheets read back with no columns; nothing to tabulate
+        return ""
+    header = np.array([str(c) for c in df.columns.tolist()])
+    # Stringify and pad column-wise in C instead of cell-by-cell in Python.
+    # astype(str) forces a fixed-width unicode dtype: the DataFrame side
+    # comes out object-dtype, which np.char refuses to operate on.
+    cells = np.vstack([header.reshape(1, -1), df.astype(str).to_numpy()]).astype(str)
+    widths = np.char.str_len(cells).max(axis=0)
+    padded = np.char.ljust(cells, widths)
+    rows = np.apply_along_axis(" | ".join, 1, padded)
+    separator = "|" + "|".join("-" * (w + 2) for w in widths) + "|"
+    lines = [f"| {rows[0]} |", separator]
+    lines.extend(f"| {row} |" for row in rows[1:])
+    return "\n".join(lines)
+
+def _convert_excel_pandas(data):
+    """Fallback XLSX path via pandas/openpyxl when calamine is absent."""
+    import pandas as pd
+    xls = pd.read_excel(io.BytesIO(data), sheet_name=None)
+    output = []
+    for sheet_name, df in xls.items():
+        output.append(f"### Sheet: {sheet_name}")
+        output.append(_df_to_md(df))
+    return "\n\n".join(output)
+
+def convert_excel(data):
     try:
-        xls = pd.read_excel(file_stream, sheet_name=None)
+        try:
+            from python_calamine import CalamineWorkbook
+        except ImportError:
+            return _convert_excel_pandas(data)
+        wb = CalamineWorkbook.from_filelike(io.BytesIO(data))
         output = []
-        for sheet_name, df in xls.items():
+        for sheet_name in wb.sheet_names:
+            rows = wb.get_sheet_by_name(sheet_name).to_python()
             output.append(f"### Sheet: {sheet_name}")
-            output.append(df.to_markdown(index=False))
+            output.append(_rows_to_markdown(rows))
         return "\n\n".join(output)
     except Exception as e:
         return f"Error reading Excel: {str(e)}"
 
-def convert_html(file_stream):
+def convert_html(data):
     try:
-        soup = BeautifulSoup(file_stream, "html.parser")
-        return soup.get_text(separator="\n")
+        import lxml.html
+        # itertext() walks the C-level tree, no per-tag Python objects;
+        # joining keeps the per-element "\n" separator of the old soup path
+        return "\n".join(lxml.html.fromstring(data).itertext())
     except Exception as e:
         return f"Error reading HTML: {str(e)}"
 
+# --- Per-File Conversion Task ---
+CONVERTERS = {
+    ".pdf": convert_pdf,  # .pdf re-dispatches through PDF_BACKENDS
+    ".docx": convert_docx,
+    ".pptx": convert_pptx,
+    ".xlsx": convert_excel,
+    ".html": convert_html,
+    ".htm": convert_html,
+}
+
+def _convert_one(file_ext, data, pdf_backend):
+    """Converts one file's raw bytes; runs in a worker process."""
+    if file_ext == ".pdf":
+        return PDF_BACKENDS[pdf_backend](data)
+    converter = CONVERTERS.get(file_ext)
+    return converter(data) if converter else ""
+
+@st.cache_resource
+def _pool():
+    """One warm process pool per Streamlit server process."""
+    return ProcessPoolExecutor(max_workers=os.cpu_count())
+
+@st.cache_data(max_entries=32, show_spinner=False)
+def _convert_cached(file_ext, data, pdf_backend):
+    """Caches conversions on content, so reruns skip reparsing entirely."""
+    return _pool().submit(_convert_one, file_ext, data, pdf_backend).result()
+
+# --- Result Rendering ---
+def _render_result(file_name, converted_text, original_size):
+    with st.expander(f"Processing: {file_name}", expanded=True):
+
+        if not converted_text or converted_text.strip() == "":
+            st.warning("⚠️ No text extracted.")
+        else:
+            # 1. Encode once: the byte count and the download payload
+            # share the same allocation instead of encoding twice
+            encoded_text = converted_text.encode('utf-8')
+            converted_bytes = len(encoded_text)
+
+            # 2. Create Tabs for View
+            tab1, tab2 = st.tabs(["📝 Preview & Download", "📊 File Size Comparison"])
+
+            # --- Tab 1: Preview ---
+            with tab1:
+                st.text_area("Markdown Output", converted_text, height=250, key=f"text_{file_name}")
+
+                base_name = os.path.splitext(file_name)[0]
+                c1, c2 = st.columns(2)
+                with c1:
+                    st.download_button("📥 Download Markdown", encoded_text, f"{base_name}.md",
+                                       mime="text/markdown")
+                with c2:
+                    st.download_button("📄 Download Text", encoded_text, f"{base_name}.txt",
+                                       mime="text/plain")
+
+            # --- Tab 2: Comparison ---
+            with tab2:
+                # Calculate reduction percentage
+                if original_size > 0:
+                    reduction = (1 - (converted_bytes / original_size)) * 100
+                else:
+                    reduction = 0
+
+                st.markdown("#### 📉 Storage Efficiency Analysis")
+
+                # Three rows don't justify a DataFrame on every rerun
+                st.markdown(
+                    "| Metric | Value |\n"
+                    "|---|---|\n"
+                    f"| Original File Size | {format_file_size(original_size)} |\n"
+                    f"| Converted Text Size | {format_file_size(converted_bytes)} |\n"
+                    f"| Space Saved | {reduction:.1f}% |"
+                )
+
+                # Big visual callout
+                st.info(f"✨ The text version is **{reduction:.1f}% smaller** than the original file.")
+
 # --- Main Application ---
 def main():
     st.title("📄 Universal Document to Markdown")
     st.markdown("Convert documents securely and analyze storage efficiency.")
 
+    # [1] PDF Backend Selection
+    pdf_backend = st.sidebar.selectbox(
+        "PDF extraction backend",
+        ["pymupdf", "pypdfium2", "pypdf"],
+        help="pymupdf is fastest; pypdfium2 avoids MuPDF's AGPL license."
+    )
+
     # [2] Upload Area
     uploaded_files = st.file_uploader(
         "Drag and drop files (PDF, DOCX, XLSX, PPTX, HTML)", 
@@ -88,81 +280,32 @@ def main():
 
     if uploaded_files:
         st.markdown("---")
-        
+
+        # 1. Collect raw bytes per file; each conversion is independent
+        # and CPU-bound, so fan out across a process pool.
+        jobs = []
         for uploaded_file in uploaded_files:
             file_name = uploaded_file.name
             file_ext = os.path.splitext(file_name)[1].lower()
-            
-            with st.expander(f"Processing: {file_name}", expanded=True):
-                
-                # 1. Calculate Original Size
-                # seek(0,2) moves cursor to end to get size, then seek(0) resets for reading
-                uploaded_file.seek(0, 2)
-                original_size = uploaded_file.tell()
-                uploaded_file.seek(0)
-                
-                # 2. Conversion
-                converted_text = ""
-                if file_ext == ".pdf":
-                    converted_text = convert_pdf(uploaded_file)
-                elif file_ext == ".docx":
-                    converted_text = convert_docx(uploaded_file)
-                elif file_ext == ".pptx":
-                    converted_text = convert_pptx(uploaded_file)
-                elif file_ext == ".xlsx":
-                    converted_text = convert_excel(uploaded_file)
-                elif file_ext in [".html", ".htm"]:
-                    converted_text = convert_html(uploaded_file)
-                else:
-                    st.error(f"⚠️ Format {file_ext} not supported.")
-                    continue
+            if file_ext not in CONVERTERS:
+                st.error(f"⚠️ Format {file_ext} not supported.")
+                continue
+            jobs.append((file_name, file_ext, uploaded_file.getvalue(), uploaded_file.size))
 
-                if not converted_text or converted_text.strip() == "":
-                    st.warning("⚠️ No text extracted.")
-                else:
-                    # 3. Calculate Converted Size (approx bytes in UTF-8)
-                    converted_bytes = len(converted_text.encode('utf-8'))
-                    
-                    # 4. Create Tabs for View
-                    tab1, tab2 = st.tabs(["📝 Preview & Download", "📊 File Size Comparison"])
-                    
-                    # --- Tab 1: Preview ---
-                    with tab1:
-                        st.text_area("Markdown Output", converted_text, height=250, key=f"text_{file_name}")
-                        
-                        base_name = os.path.splitext(file_name)[0]
-                        c1, c2 = st.columns(2)
-                        with c1:
-                            st.download_button("📥 Download Markdown", converted_text, f"{base_name}.md")
-                        with c2:
-                            st.download_button("📄 Download Text", converted_text, f"{base_name}.txt")
-
-                    # --- Tab 2: Comparison ---
-                    with tab2:
-                        # Calculate reduction percentage
-                        if original_size > 0:
-                            reduction = (1 - (converted_bytes / original_size)) * 100
-                        else:
-                            reduction = 0
-                            
-                        st.markdown("#### 📉 Storage Efficiency Analysis")
-                        
-                        # Create a clean data table
-                        data = {
-                            "Metric": ["Original File Size", "Converted Text Size", "Space Saved"],
-                            "Value": [
-                                format_file_size(original_size), 
-                                format_file_size(converted_bytes),
-                                f"{reduction:.1f}%"
-                            ]
-                        }
-                        df_comparison = pd.DataFrame(data)
-                        
-                        # Display table
-                        st.table(df_comparison)
-                        
-                        # Big visual callout
-                        st.info(f"✨ The text version is **{reduction:.1f}% smaller** than the original file.")
+        if not jobs:
+            return
+
+        # 2. Convert in parallel, rendering each file as it completes.
+        # Threads here only wait on the cache or the shared process pool,
+        # so cache misses still run across cores while hits return at once.
+        with ThreadPoolExecutor(max_workers=len(jobs)) as executor:
+            futures = {
+                executor.submit(_convert_cached, file_ext, data, pdf_backend): (file_name, original_size)
+                for file_name, file_ext, data, original_size in jobs
+            }
+            for future in as_completed(futures):
+                file_name, original_size = futures[future]
+                _render_result(file_name, future.result(), original_size)
 
 if __name__ == "__main__":
     main()